@@ -3,9 +3,15 @@
 # Capítulo 5 — Modelagem Híbrida IA + Físico
 # ============================================================
 
-import cudf
+import shutil
 from pathlib import Path
 
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+import cudf
+
 BASE_DIR = Path("/mnt/c/PROJETO_2025_TESE")
 DATA_DIR = BASE_DIR / "data" / "meteorologia"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -35,25 +41,47 @@ if INPUT_PARQUET is None:
         + "\n"
     )
 
-# 2) Carrega, valida e ordena
-df = cudf.read_parquet(str(INPUT_PARQUET))
+# 2) Caminho rápido (CPU): valida a ordenação lendo apenas a coluna date_time.
+# Se a série já está ordenada, copia o parquet sem o round-trip pela GPU.
+pf = pq.ParquetFile(str(INPUT_PARQUET))
+
+if "date_time" not in pf.schema_arrow.names:
+    raise KeyError("Campo 'date_time' ausente no dataset de entrada (P1.5).")
 
 print("Dataset de entrada (P1.5) localizado:")
 print(f"{INPUT_PARQUET}")
-print(f"Linhas: {len(df)} | Colunas: {len(df.columns)}")
+print(f"Linhas: {pf.metadata.num_rows} | Colunas: {len(pf.schema_arrow.names)}")
 
-if "date_time" not in df.columns:
-    raise KeyError("Campo 'date_time' ausente no dataset de entrada (P1.5).")
+dt = pf.read(columns=["date_time"]).column(0).combine_chunks()
+ja_ordenado = (
+    pa.types.is_timestamp(dt.type)
+    and dt.null_count == 0
+    and (
+        len(dt) <= 1
+        or bool(pc.all(pc.greater_equal(dt.slice(1), dt.slice(0, len(dt) - 1))).as_py())
+    )
+)
+
+if ja_ordenado:
+    print("Validação temporal final confirmada (date_time crescente).")
+    # 3) Persiste o dataset mestre (cópia direta, entrada já ordenada)
+    shutil.copyfile(INPUT_PARQUET, OUTPUT_PARQUET)
+else:
+    # Fallback GPU: carrega, valida e ordena
+    df = cudf.read_parquet(str(INPUT_PARQUET))
 
-df = df.sort_values("date_time").reset_index(drop=True)
+    # Ordena apenas a coluna-chave e aplica a permutação com um único gather,
+    # em vez de carregar a tabela inteira pelo sort
+    order = df["date_time"].argsort()
+    df = df.take(order).reset_index(drop=True)
 
-if not df["date_time"].is_monotonic_increasing:
-    raise ValueError("Série temporal não está monotonicamente crescente após ordenação.")
+    if not df["date_time"].is_monotonic_increasing:
+        raise ValueError("Série temporal não está monotonicamente crescente após ordenação.")
 
-print("Validação temporal final confirmada (date_time crescente).")
+    print("Validação temporal final confirmada (date_time crescente).")
 
-# 3) Persiste o dataset mestre
-df.to_parquet(str(OUTPUT_PARQUET), index=False)
+    # 3) Persiste o dataset mestre
+    df.to_parquet(str(OUTPUT_PARQUET), index=False)
 
 print("==============================================")
 print("Etapa P1.6 concluída com sucesso.")
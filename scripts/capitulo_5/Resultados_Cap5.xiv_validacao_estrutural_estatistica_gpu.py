@@ -21,14 +21,19 @@ from __future__ import annotations
 import sys
 import json
 import time
+import mmap
 import hashlib
 import platform
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
 import numpy as np
 
+import pyarrow.csv as pacsv
+import pyarrow.parquet as papq
+
 import cudf
 import cupy as cp
 
@@ -58,45 +63,73 @@ def read_env_file(env_path: Path) -> dict:
     return out
 
 
-def sha256_file(path: Path, chunk_size: int = 1024 * 1024) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
+MMAP_MIN_BYTES = 256 * 1024 * 1024
+
+
+def sha256_file(path: Path, chunk_size: int = 4 * 1024 * 1024) -> str:
+    # Arquivos grandes: mmap com madvise SEQUENTIAL/WILLNEED deixa o kernel
+    # sobrepor o readahead do disco com os updates do SHA
+    if path.stat().st_size >= MMAP_MIN_BYTES:
+        try:
+            with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                    mm.madvise(mmap.MADV_WILLNEED)
+                h = hashlib.sha256()
+                h.update(mm)
+                return h.hexdigest()
+        except (ValueError, OSError):
+            pass  # sem mmap disponível; segue para a leitura em blocos
+    # Python >= 3.11: hashlib.file_digest faz o loop de leitura/atualização
+    # em C (OpenSSL), sem reentrar no interpretador a cada bloco.
+    with path.open("rb", buffering=0) as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        # Fallback (<3.11): blocos de 4 MiB reutilizando o mesmo buffer
+        h = hashlib.sha256()
+        buf = bytearray(chunk_size)
+        mv = memoryview(buf)
         while True:
-            b = f.read(chunk_size)
-            if not b:
+            n = f.readinto(mv)
+            if not n:
                 break
-            h.update(b)
-    return h.hexdigest()
+            h.update(mv[:n])
+        return h.hexdigest()
 
 
-def run_cmd(cmd: list[str]) -> str:
+def run_cmd(cmd: list[str], timeout: float = 5.0) -> str:
     try:
-        res = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        res = subprocess.run(
+            cmd, capture_output=True, text=True, check=False, timeout=timeout
+        )
         s = (res.stdout or "") + (res.stderr or "")
         return s.strip()
     except Exception as e:
         return f"[erro ao executar comando {cmd}]: {e}"
 
 
-def safe_to_pandas_sample(df: cudf.DataFrame, n: int = 200_000, random_state: int = 42):
-    n = int(n)
-    if len(df) <= n:
-        return df.to_pandas()
-    frac = n / max(len(df), 1)
-    return df.sample(frac=frac, random_state=random_state).to_pandas()
+def write_table_artifact(gdf: cudf.DataFrame, csv_path: Path) -> None:
+    """Persiste uma tabela pequena como CSV (pyarrow, em lote) + .parquet irmão.
 
-
-def is_numeric_dtype(dtype) -> bool:
-    s = str(dtype)
-    return any(t in s for t in ["int", "float", "uint", "decimal"])
+    Evita o pipeline de serialização CSV do cuDF para artefatos de poucas
+    linhas; o parquet irmão dá acesso colunar às análises posteriores da tese.
+    """
+    # preserve_index=False: equivale ao index=False do to_csv substituído,
+    # independente do default da versão do cuDF instalada
+    tbl = gdf.to_arrow(preserve_index=False)
+    pacsv.write_csv(tbl, str(csv_path))
+    papq.write_table(tbl, str(csv_path.with_suffix(".parquet")), compression="snappy")
 
 
 def schema_table(df: cudf.DataFrame) -> cudf.DataFrame:
+    # isnull().sum() conta os nulos de todas as colunas em um único kernel,
+    # em vez de uma redução por coluna
+    nulos = df.isnull().sum().to_pandas()
     return cudf.DataFrame(
         {
             "coluna": df.columns,
             "dtype": [str(df[c].dtype) for c in df.columns],
-            "nulos": [int(df[c].isna().sum()) for c in df.columns],
+            "nulos": [int(n) for n in nulos.values],
         }
     )
 
@@ -105,7 +138,9 @@ def basic_profile(df: cudf.DataFrame) -> dict:
     return {
         "n_linhas": int(len(df)),
         "n_colunas": int(df.shape[1]),
-        "memoria_gpu_bytes_est": int(df.memory_usage(deep=True).sum()),
+        # deep=False: tamanho reportado a partir dos metadados dos buffers,
+        # sem kernel de contagem de bytes por linha nas colunas de string
+        "memoria_gpu_bytes_est": int(df.memory_usage(deep=False).sum()),
     }
 
 
@@ -116,30 +151,46 @@ def duplicates_info(df: cudf.DataFrame) -> dict:
     return {"linhas_duplicadas": dup_rows, "tempo_s": round(dt, 3)}
 
 
-def numeric_describe(df: cudf.DataFrame) -> cudf.DataFrame:
-    num_cols = [c for c in df.columns if is_numeric_dtype(df[c].dtype)]
+def numeric_stats(df: cudf.DataFrame, num_cols: list[str]):
+    """Uma única passada fusionada pelas colunas numéricas.
+
+    Um agg cobre describe e ranges; um quantile cobre describe e quantis.
+    describe/quantis/ranges são derivados destes resultados sem novas
+    varreduras das colunas na HBM.
+    """
     if not num_cols:
+        return None, None
+    agg_df = df[num_cols].agg(["count", "mean", "std", "min", "max"])
+    qdf = df[num_cols].quantile(
+        [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99], interpolation="linear"
+    )
+    return agg_df, qdf
+
+
+def numeric_describe(agg_df, qdf) -> cudf.DataFrame:
+    if agg_df is None:
         return cudf.DataFrame()
-    desc = df[num_cols].describe()
+    mid = qdf.loc[[0.25, 0.5, 0.75]]
+    mid.index = ["25%", "50%", "75%"]
+    desc = cudf.concat(
+        [agg_df.loc[["count", "mean", "std", "min"]], mid, agg_df.loc[["max"]]]
+    )
     return desc.reset_index().rename(columns={"index": "estatistica"})
 
 
-def numeric_quantiles(df: cudf.DataFrame, qs=(0.01, 0.05, 0.95, 0.99)) -> cudf.DataFrame:
-    num_cols = [c for c in df.columns if is_numeric_dtype(df[c].dtype)]
-    if not num_cols:
+def numeric_quantiles(qdf, qs=(0.01, 0.05, 0.95, 0.99)) -> cudf.DataFrame:
+    if qdf is None:
         return cudf.DataFrame()
-    qdf = df[num_cols].quantile(list(qs), interpolation="linear")
-    qdf = qdf.reset_index().rename(columns={"index": "quantil"})
-    qdf["quantil"] = qdf["quantil"].astype(str)
-    return qdf
+    out = qdf.loc[list(qs)].reset_index().rename(columns={"index": "quantil"})
+    out["quantil"] = out["quantil"].astype(str)
+    return out
 
 
-def range_flags(df: cudf.DataFrame) -> cudf.DataFrame:
-    num_cols = [c for c in df.columns if is_numeric_dtype(df[c].dtype)]
-    if not num_cols:
+def range_flags(agg_df, num_cols: list[str]) -> cudf.DataFrame:
+    if agg_df is None:
         return cudf.DataFrame()
-    mins = df[num_cols].min()
-    maxs = df[num_cols].max()
+    mins = agg_df.loc["min"]
+    maxs = agg_df.loc["max"]
     out = cudf.DataFrame({"coluna": num_cols, "min": mins.values, "max": maxs.values})
     out["range"] = out["max"] - out["min"]
     out["flag_invertido"] = (out["max"] < out["min"])
@@ -151,42 +202,61 @@ def range_flags(df: cudf.DataFrame) -> cudf.DataFrame:
     return out
 
 
-def save_figures(df: cudf.DataFrame, out_fig: Path, log_lines: list[str]) -> list[str]:
+def save_figures(df: cudf.DataFrame, num_cols: list[str], out_fig: Path, log_lines: list[str], agg_df, qdf) -> list[str]:
     ensure_dir(out_fig)
     saved: list[str] = []
 
-    num_cols = [c for c in df.columns if is_numeric_dtype(df[c].dtype)]
     if not num_cols:
         log_lines.append("Sem colunas numéricas detectadas; pulando gráficos.")
         return saved
 
-    pdf = safe_to_pandas_sample(df[num_cols], n=200_000)
+    cols = num_cols[:4]
 
-    for c in num_cols[:4]:
-        try:
-            plt.figure()
-            pdf[c].dropna().hist(bins=50)
-            plt.title(f"Histograma: {c}")
-            plt.xlabel(c)
-            plt.ylabel("Frequência")
-            fp = out_fig / f"hist_{c}.png"
-            plt.tight_layout()
-            plt.savefig(fp, dpi=150)
-            plt.close()
-            saved.append(fp.name)
-        except Exception as e:
-            log_lines.append(f"Falha ao gerar histograma {c}: {e}")
+    # Histogramas computados na GPU (cupy.histogram): por coluna cruzam o
+    # PCIe apenas as contagens e bordas dos bins (~800 B), não a amostra
+    try:
+        fig, axes = plt.subplots(2, 2, figsize=(10, 8))
+        for ax, c in zip(axes.ravel(), cols):
+            counts, edges = cp.histogram(df[c].dropna().values, bins=50)
+            counts = cp.asnumpy(counts)
+            edges = cp.asnumpy(edges)
+            ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge")
+            ax.set_title(f"Histograma: {c}")
+            ax.set_xlabel(c)
+            ax.set_ylabel("Frequência")
+        for ax in axes.ravel()[len(cols):]:
+            ax.set_visible(False)
+        fp = out_fig / "histogramas_primeiras_colunas.png"
+        fig.tight_layout()
+        fig.savefig(fp, dpi=150)
+        plt.close(fig)
+        saved.append(fp.name)
+    except Exception as e:
+        log_lines.append(f"Falha ao gerar histogramas: {e}")
 
+    # Boxplot a partir das estatísticas da passada fusionada
+    # (min/q1/mediana/q3/max): nenhum dado bruto sai da GPU
     try:
-        plt.figure()
-        data = [pdf[c].dropna().values for c in num_cols[:4]]
-        plt.boxplot(data, labels=num_cols[:4], showfliers=True)
-        plt.title("Boxplot (amostra) — primeiras colunas numéricas")
-        plt.xticks(rotation=30, ha="right")
+        fig, ax = plt.subplots()
+        stats = [
+            {
+                "label": c,
+                "whislo": float(agg_df[c].loc["min"]),
+                "q1": float(qdf[c].loc[0.25]),
+                "med": float(qdf[c].loc[0.5]),
+                "q3": float(qdf[c].loc[0.75]),
+                "whishi": float(agg_df[c].loc["max"]),
+                "fliers": [],
+            }
+            for c in cols
+        ]
+        ax.bxp(stats, showfliers=False)
+        ax.set_title("Boxplot (min/quartis/max) — primeiras colunas numéricas")
+        ax.tick_params(axis="x", rotation=30)
         fp = out_fig / "boxplot_primeiras_colunas.png"
-        plt.tight_layout()
-        plt.savefig(fp, dpi=150)
-        plt.close()
+        fig.tight_layout()
+        fig.savefig(fp, dpi=150)
+        plt.close(fig)
         saved.append(fp.name)
     except Exception as e:
         log_lines.append(f"Falha ao gerar boxplot: {e}")
@@ -211,6 +281,14 @@ def main() -> int:
     for pth in [outdir, out_logs, out_tabs, out_figs, out_meta]:
         ensure_dir(pth)
 
+    # Comandos de ambiente (git, nvidia-smi) em threads: podem levar centenas
+    # de ms e saem do caminho que antecede o read_parquet; os resultados são
+    # coletados só na escrita do metadata
+    env_pool = ThreadPoolExecutor(max_workers=3)
+    fut_git_head = env_pool.submit(run_cmd, ["git", "rev-parse", "HEAD"])
+    fut_git_branch = env_pool.submit(run_cmd, ["git", "branch", "--show-current"])
+    fut_smi = env_pool.submit(run_cmd, ["nvidia-smi"])
+
     run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = out_logs / f"run_{run_id}.log"
     meta_file = out_meta / f"run_{run_id}.json"
@@ -230,9 +308,6 @@ def main() -> int:
         "cudf": getattr(cudf, "__version__", "unknown"),
         "cupy": getattr(cp, "__version__", "unknown"),
         "numpy": getattr(np, "__version__", "unknown"),
-        "git_head": run_cmd(["git", "rev-parse", "HEAD"]),
-        "git_branch": run_cmd(["git", "branch", "--show-current"]),
-        "nvidia_smi": run_cmd(["nvidia-smi"]),
         "paths": {
             "env_file": str(env_path),
             "parquet": str(parquet_path),
@@ -241,14 +316,15 @@ def main() -> int:
         },
     }
 
-    env_info["input_hashes"] = {
-        "parquet_sha256": sha256_file(parquet_path) if parquet_path.exists() else None,
-        "csv_sha256": sha256_file(csv_path) if csv_path.exists() else None,
-    }
-
     if not parquet_path.exists():
         raise FileNotFoundError(f"Parquet não encontrado: {parquet_path}")
 
+    # Hashes dos insumos em threads: rodam enquanto o cudf.read_parquet
+    # ocupa I/O e GPU, saindo do caminho crítico.
+    hash_pool = ThreadPoolExecutor(max_workers=2)
+    fut_sha_parquet = hash_pool.submit(sha256_file, parquet_path)
+    fut_sha_csv = hash_pool.submit(sha256_file, csv_path) if csv_path.exists() else None
+
     t0 = time.time()
     df = cudf.read_parquet(str(parquet_path))
     load_s = round(time.time() - t0, 3)
@@ -257,10 +333,15 @@ def main() -> int:
     prof = basic_profile(df)
     log_lines.append(f"Perfil básico: {prof}")
 
+    # Colunas numéricas resolvidas uma única vez; os helpers recebem a lista
+    # em vez de varrer os dtypes por conta própria
+    num_cols = df.select_dtypes(include="number").columns.tolist()
+    agg_df, qdf_full = numeric_stats(df, num_cols)
+
     # 1) schema / nulos
     sch = schema_table(df)
     sch_out = out_tabs / f"schema_nulos_{run_id}.csv"
-    sch.to_csv(str(sch_out), index=False)
+    write_table_artifact(sch, sch_out)
     log_lines.append(f"Gerado: {sch_out}")
 
     # 2) duplicatas
@@ -270,39 +351,50 @@ def main() -> int:
     log_lines.append(f"Gerado: {dup_out} -> {dup}")
 
     # 3) describe numérico
-    desc = numeric_describe(df)
+    desc = numeric_describe(agg_df, qdf_full)
     desc_out = None
     if len(desc) > 0:
         desc_out = out_tabs / f"describe_numerico_{run_id}.csv"
-        desc.to_csv(str(desc_out), index=False)
+        write_table_artifact(desc, desc_out)
         log_lines.append(f"Gerado: {desc_out}")
     else:
         log_lines.append("Sem colunas numéricas para describe().")
 
     # 4) quantis
-    qdf = numeric_quantiles(df)
+    qdf = numeric_quantiles(qdf_full)
     q_out = None
     if len(qdf) > 0:
         q_out = out_tabs / f"quantis_numericos_{run_id}.csv"
-        qdf.to_csv(str(q_out), index=False)
+        write_table_artifact(qdf, q_out)
         log_lines.append(f"Gerado: {q_out}")
     else:
         log_lines.append("Sem colunas numéricas para quantis.")
 
     # 5) ranges/flags
-    rflags = range_flags(df)
+    rflags = range_flags(agg_df, num_cols)
     rf_out = None
     if len(rflags) > 0:
         rf_out = out_tabs / f"ranges_flags_{run_id}.csv"
-        rflags.to_csv(str(rf_out), index=False)
+        write_table_artifact(rflags, rf_out)
         log_lines.append(f"Gerado: {rf_out}")
     else:
         log_lines.append("Sem colunas numéricas para ranges/flags.")
 
     # 6) figuras
-    figs = save_figures(df, out_figs, log_lines)
+    figs = save_figures(df, num_cols, out_figs, log_lines, agg_df, qdf_full)
     log_lines.append(f"Figuras geradas: {figs}")
 
+    env_info["git_head"] = fut_git_head.result()
+    env_info["git_branch"] = fut_git_branch.result()
+    env_info["nvidia_smi"] = fut_smi.result()
+    env_pool.shutdown()
+
+    env_info["input_hashes"] = {
+        "parquet_sha256": fut_sha_parquet.result(),
+        "csv_sha256": fut_sha_csv.result() if fut_sha_csv is not None else None,
+    }
+    hash_pool.shutdown()
+
     env_info["profile"] = prof
     env_info["load_time_s"] = load_s
     env_info["outputs"] = {
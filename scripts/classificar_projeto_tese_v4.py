@@ -19,9 +19,13 @@
 # ============================================================
 
 from pathlib import Path
-import csv
+import re
 from datetime import datetime
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
 ROOT = Path(r"C:\PROJETO_2025_TESE")
 INVENTORY = ROOT / "resultados" / "diagnostico" / "files_inventory.csv"
 OUT_CSV = ROOT / "resultados" / "diagnostico" / "classificacao_preliminar_v4.csv"
@@ -39,6 +43,38 @@ TABULAR_EXT = {".csv", ".parquet", ".xlsx", ".xls"}
 MEDIA_EXT = {".jpg", ".jpeg", ".png", ".wav", ".mp4"}
 OTHER_EXT = {".unknown", ".t"}  # extensões “estranhas” detectadas
 
+# Substrings consultadas por classify(), agrupadas por regra.
+# Nota: "/mapbioma" já cobre "/mapbiomas".
+TAGS_GIT = {"/.git/"}
+TAGS_CAP5_NUCLEO = {"/03_modelagem/resultados_cap5/"}
+TAGS_ACERVO = {"/11_livros/", "z-lib", "/dlwpt-code-master/"}
+TAGS_EXTERNOS = {"/prisma", "/mapbioma", "/attos"}
+TAGS_UTILITARIOS = {"inventario", "scan_", "excluir_", "criar_subpastas"}
+TAGS_PASTAS_DADOS = {"/05_dados_", "/06_resultados/", "/dados_", "/10_shape_", "/03_modelagem/"}
+
+# Um único autômato compilado varre o caminho uma vez e devolve o conjunto
+# de tags presentes, em vez de ~20 buscas `in` por arquivo do inventário.
+# A alternância fica dentro de um lookahead (largura zero) para que tags
+# sobrepostas também sejam encontradas — p.ex. "/06_resultados/prisma_x.tif"
+# contém "/06_resultados/" e "/prisma" compartilhando a mesma barra.
+TAG_SCANNER = re.compile(
+    "(?=("
+    + "|".join(
+        re.escape(t)
+        for t in sorted(
+            TAGS_GIT | TAGS_CAP5_NUCLEO | TAGS_ACERVO | TAGS_EXTERNOS
+            | TAGS_UTILITARIOS | TAGS_PASTAS_DADOS,
+            key=len,
+            reverse=True,  # alternativas mais longas primeiro
+        )
+    )
+    + "))"
+)
+
+
+def scan_tags(p: str) -> set:
+    return {m.group(1) for m in TAG_SCANNER.finditer(p)}
+
 
 def norm(s: str) -> str:
     return (s or "").replace("\\", "/").lower()
@@ -47,9 +83,10 @@ def norm(s: str) -> str:
 def classify(path_rel: str, ext: str):
     p = norm(path_rel)
     e = (ext or "").lower()
+    tags = scan_tags(p)
 
     # 0) IGNORAR Git
-    if p.startswith(".git/") or "/.git/" in p:
+    if p.startswith(".git/") or tags & TAGS_GIT:
         return None
 
     # 1) README
@@ -61,7 +98,7 @@ def classify(path_rel: str, ext: str):
         return "TESE_PROVAVEL", "Evidência/resultado do Capítulo 5 (resultados/capitulo_5)"
 
     # 3) Núcleo do Capítulo 5 (em árvore antiga TESE_Prof.../03_Modelagem/Resultados_Cap5)
-    if "/03_modelagem/resultados_cap5/" in p:
+    if tags & TAGS_CAP5_NUCLEO:
         return "TESE_PROVAVEL", "Script/artefato do Capítulo 5 (núcleo metodológico)"
 
     # 4) Scripts organizados do Capítulo 5
@@ -69,15 +106,15 @@ def classify(path_rel: str, ext: str):
         return "TESE_PROVAVEL", "Script do Capítulo 5 (organizado)"
 
     # 5) Tudo em 11_Livros é acervo (independe de extensão)
-    if "/11_livros/" in p or "z-lib" in p or "/dlwpt-code-master/" in p:
+    if tags & TAGS_ACERVO:
         return "ACERVO_LIVROS", "Acervo de livros/código/datasets de terceiros (11_Livros)"
 
     # 6) PRISMA / MapBiomas / ATTOS (pré-processamento/dados externos)
-    if any(tag in p for tag in ["/prisma", "/mapbioma", "/mapbiomas", "/attos"]):
+    if tags & TAGS_EXTERNOS:
         return "DADOS_EXTERNOS", "PRISMA/MapBiomas/ATTOS (pré-processamento/dados externos)"
 
     # 7) Inventários / utilitários genéricos
-    if any(tag in p for tag in ["inventario", "scan_", "excluir_", "criar_subpastas"]):
+    if tags & TAGS_UTILITARIOS:
         return "ACERVO_LIVROS", "Utilitário genérico / inventário"
 
     # 8) Arquivos tabulares (csv/parquet/xlsx/xls) fora de resultados/ -> dados externos
@@ -92,7 +129,7 @@ def classify(path_rel: str, ext: str):
 
     # 10) Arquivo sem extensão: se estiver em pastas de dados/resultados -> dados externos
     if e == "" or e is None:
-        if any(tag in p for tag in ["/05_dados_", "/06_resultados/", "/dados_", "/10_shape_", "/03_modelagem/"]):
+        if tags & TAGS_PASTAS_DADOS:
             return "DADOS_EXTERNOS", "Arquivo sem extensão em pasta de dados/resultados"
         return "INDETERMINADO", "Arquivo sem extensão (revisão manual mínima)"
 
@@ -129,43 +166,52 @@ def main():
     if not INVENTORY.exists():
         raise FileNotFoundError(f"Inventário não encontrado: {INVENTORY}")
 
-    rows_out = []
+    # Leitura colunar (pyarrow) em vez de csv.DictReader: o loop quente
+    # consome arrays NumPy, sem um dict por linha do inventário
+    table = pacsv.read_csv(str(INVENTORY))
+
+    def col(name: str) -> np.ndarray:
+        if name in table.column_names:
+            return table.column(name).to_numpy(zero_copy_only=False)
+        return np.full(table.num_rows, "", dtype=object)
+
+    paths = col("path")
+    names = col("name")
+    exts = col("extension")
+    sizes = col("size_kb")
+
+    n = table.num_rows
+    keep = np.zeros(n, dtype=bool)
+    cats = np.empty(n, dtype=object)
+    whys = np.empty(n, dtype=object)
+
     counts = {"TESE_PROVAVEL": 0, "DADOS_EXTERNOS": 0, "ACERVO_LIVROS": 0, "INDETERMINADO": 0}
     ignored = 0
 
-    with INVENTORY.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            path_rel = r.get("path", "")
-            ext = r.get("extension", "")
-            size_kb = r.get("size_kb", "")
-
-            res = classify(path_rel, ext)
-            if res is None:
-                ignored += 1
-                continue
-
-            cat, why = res
-            counts[cat] += 1
-
-            rows_out.append({
-                "path": path_rel,
-                "name": r.get("name", ""),
-                "extension": ext,
-                "size_kb": size_kb,
-                "categoria": cat,
-                "justificativa": why,
-            })
+    for i in range(n):
+        res = classify(paths[i] or "", exts[i] or "")
+        if res is None:
+            ignored += 1
+            continue
+
+        cat, why = res
+        counts[cat] += 1
+        keep[i] = True
+        cats[i] = cat
+        whys[i] = why
 
     OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
 
-    with OUT_CSV.open("w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=["path", "name", "extension", "size_kb", "categoria", "justificativa"]
-        )
-        writer.writeheader()
-        writer.writerows(rows_out)
+    # Escrita em lote (pyarrow) em vez de DictWriter linha a linha
+    out_table = pa.table({
+        "path": paths[keep],
+        "name": names[keep],
+        "extension": exts[keep],
+        "size_kb": sizes[keep],
+        "categoria": cats[keep],
+        "justificativa": whys[keep],
+    })
+    pacsv.write_csv(out_table, str(OUT_CSV))
 
     ts = datetime.now().isoformat(timespec="seconds")
     total = sum(counts.values())